@@ -12,22 +12,277 @@ Features:
 """
 
 import os
+import sys
+import pathlib
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
+import re
+import string
 from datetime import datetime
-from typing import Dict, List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
 from langchain_community.llms import LlamaCpp
 from langchain.callbacks.manager import CallbackManager
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from huggingface_hub import hf_hub_download
+from huggingface_hub import hf_hub_download, try_to_load_from_cache
+from llama_cpp import LlamaDiskCache
+import concurrent.futures
+import functools
+import heapq
+import threading
 
 # Load environment variables
 load_dotenv()
 
+# Reports directory, resolved and created once at import
+REPORTS_DIR = pathlib.Path.home() / 'Downloads' / 'AI_MULTI AGENT_SYSTEM' / 'reports'
+REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+
+# GGUF repositories and filename patterns, selected with AI_USECASE_MODEL
+MODELS = {
+    'llama-2-7b-chat': ('TheBloke/Llama-2-7B-Chat-GGUF', 'llama-2-7b-chat.{quant}.gguf'),
+    'tinyllama': ('TheBloke/TinyLlama-1.1B-Chat-v1.0-GGUF', 'tinyllama-1.1b-chat-v1.0.{quant}.gguf')
+}
+
+def model_file() -> tuple:
+    """Resolve the (repo_id, filename) of the configured model and quantization"""
+    model = os.getenv('AI_USECASE_MODEL', 'llama-2-7b-chat')
+    quant = os.getenv('AI_USECASE_QUANT', 'Q4_K_M')
+    if model not in MODELS:
+        raise ValueError(f"Unknown AI_USECASE_MODEL '{model}'. Choose one of: {', '.join(MODELS)}")
+    repo_id, pattern = MODELS[model]
+    return repo_id, pattern.format(quant=quant)
+
+# Constant instructions ahead of the company text, so every prompt shares
+# this prefix and the KV cache only has to prefill the company summary
+_PROMPT_PREFIX = """Generate 5 practical AI/GenAI use cases based on the company research below.
+
+Focus areas:
+- Operational Efficiency
+- Customer Experience
+- Product Innovation
+- Process Automation
+- Data Analytics
+
+Format each as:
+Use Case #[number]:
+1. Problem: [challenge]
+2. Solution: [AI/ML approach]
+3. Complexity: [Low/Medium/High]
+4. Impact: [benefits]
+5. Resources: [requirements]
+
+Company research:
+"""
+
+# One "Use Case #N:" section, up to the next marker or end of text
+_CASE_RE = re.compile(r'Use Case #(\d+):?\s*(.*?)(?=Use Case #\d+|\Z)', re.DOTALL)
+
+def parse_use_cases(response: str) -> List[Dict]:
+    """Split model output into structured use cases"""
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return [
+        {
+            'id': int(m.group(1)),
+            'description': m.group(2).strip(),
+            'generated_at': generated_at
+        }
+        for m in _CASE_RE.finditer(response)
+        if m.group(2).strip()
+    ]
+
+# The loaded model is shared process-wide (e.g. by all Streamlit sessions);
+# llama.cpp contexts are not thread-safe, so loading and generation are serialized
+_llm_load_lock = threading.Lock()
+_generation_lock = threading.Lock()
+
+# ASCII punctuation and whitespace, stripped when scoring content
+_DELIMITERS = (string.punctuation + string.whitespace).encode('ascii')
+
+def content_score(content: str) -> int:
+    """Count UTF-8 bytes other than ASCII punctuation and whitespace, so non-English text scores as content"""
+    return len(content.encode('utf-8').translate(None, _DELIMITERS))
+
+def resolve_model_path(token: str) -> str:
+    """Return the local model file, downloading it only when it is not cached yet"""
+    repo_id, filename = model_file()
+    # Local lookup avoids a hub round trip on every start
+    path = try_to_load_from_cache(repo_id=repo_id, filename=filename)
+    if not isinstance(path, str):
+        path = hf_hub_download(repo_id=repo_id, filename=filename, token=token)
+    return path
+
+def stream_parse_cases(llm: LlamaCpp, prompt: str, max_cases: int = 5) -> Iterator[Dict]:
+    """Yield each use case as soon as it is complete in the streamed model output"""
+    buffer = ''
+    with _generation_lock:
+        # Stop generating once the model starts a case beyond what was asked for
+        for chunk in llm.stream(prompt, stop=[f"Use Case #{max_cases + 1}:"]):
+            buffer += chunk
+            # Everything before the latest marker is a finished case
+            end = buffer.rfind('Use Case #')
+            if end > 0:
+                yield from parse_use_cases(buffer[:end])
+                buffer = buffer[end:]
+    yield from parse_use_cases(buffer)
+
+def create_session() -> requests.Session:
+    """Create a pooled HTTP session that retries transient Tavily failures"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=2,
+            read=0,                              # A read timeout already used the full budget
+            backoff_factor=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=False,    # Keep backoff short instead of sleeping on Retry-After
+            allowed_methods=frozenset({'POST'})  # Search requests are safe to repeat
+        )
+    ))
+    return session
+
+def llama_runtime_params() -> Dict:
+    """Pick llama.cpp offload, threading and memory settings for this host"""
+    try:
+        import torch
+        has_gpu = torch.cuda.is_available() or torch.backends.mps.is_available()
+    except ImportError:
+        has_gpu = False
+    
+    return {
+        'n_gpu_layers': -1 if has_gpu else 0,   # Offload all layers to CUDA/Metal
+        'n_threads': max(1, (os.cpu_count() or 2) // 2),  # Physical cores
+        'n_batch': 512,
+        'f16_kv': True,
+        'use_mmap': True,
+        'use_mlock': False,
+        'logits_all': False
+    }
+
+def build_llm(model_path: str, cache_dir: str, stream_to_stdout: bool = False, **params) -> LlamaCpp:
+    """Create a warmed-up, host-tuned LlamaCpp model with a prefix KV cache, once per process"""
+    # Concurrent first calls would each load the model; let one do it
+    with _llm_load_lock:
+        return _load_llm(model_path, cache_dir, stream_to_stdout, **params)
+
+@functools.lru_cache(maxsize=1)
+def _load_llm(model_path: str, cache_dir: str, stream_to_stdout: bool, **params) -> LlamaCpp:
+    """Load and prepare the model; memoized by build_llm"""
+    llm = LlamaCpp(model_path=model_path, **{**llama_runtime_params(), **params})
+    
+    # Page in weights and initialize backend kernels so the first real prompt
+    # runs at steady-state speed; done before attaching the cache and stdout
+    # streaming so the dummy prompt is neither stored nor printed
+    try:
+        llm.invoke("hi", max_tokens=1)
+    except Exception as e:
+        print(f"Model warm-up error: {str(e)}")
+    
+    # Reuse KV state for prompts sharing a prefix with earlier ones. Saved state
+    # only fits the exact model file and context size, so each gets its own dir
+    state_dir = os.path.join(cache_dir, f"{os.path.basename(model_path)}-ctx{llm.n_ctx}")
+    llm.client.set_cache(LlamaDiskCache(cache_dir=state_dir, capacity_bytes=2 << 30))
+    if stream_to_stdout:
+        llm.callbacks = [StreamingStdOutCallbackHandler()]
+    return llm
+
+class SemanticCache:
+    """Embedding index of generated use cases for near-duplicate companies"""
+    
+    def __init__(self, cache_dir: str, threshold: float = 0.92):
+        self.threshold = threshold
+        self.index_path = os.path.join(cache_dir, 'index.faiss')
+        self.entries_path = os.path.join(cache_dir, 'entries.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        # Instances are shared across threads (see get_semantic_cache)
+        self._lock = threading.Lock()
+        
+        # Imported here so a missing or broken install only disables the cache,
+        # and the CLI does not pay the torch import cost unless it is used
+        import faiss
+        from sentence_transformers import SentenceTransformer
+        self._faiss = faiss
+        
+        self.encoder = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device='cpu')
+        self.index = None
+        self.entries = []
+        if os.path.exists(self.index_path) and os.path.exists(self.entries_path):
+            index = faiss.read_index(self.index_path)
+            with open(self.entries_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            # A write interrupted between the two files leaves them out of step
+            if index.ntotal == len(entries):
+                self.index, self.entries = index, entries
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(self.encoder.get_sentence_embedding_dimension())
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text as a normalized vector so inner product is cosine similarity"""
+        with self._lock:
+            return self.encoder.encode([text], normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, embedding: np.ndarray) -> Optional[List[Dict]]:
+        """Return cached use cases for the nearest entry if it is similar enough"""
+        with self._lock:
+            if self.index.ntotal == 0:
+                return None
+            scores, ids = self.index.search(embedding, 1)
+            if scores[0][0] >= self.threshold:
+                return self.entries[ids[0][0]]
+            return None
+
+    def insert(self, embedding: np.ndarray, use_cases: List[Dict]):
+        """Add an entry and persist the index"""
+        with self._lock:
+            self.index.add(embedding)
+            self.entries.append(use_cases)
+            self._persist()
+
+    def _persist(self):
+        """Write index and entries through temp files so neither is left half-written"""
+        index_tmp = self.index_path + '.tmp'
+        entries_tmp = self.entries_path + '.tmp'
+        self._faiss.write_index(self.index, index_tmp)
+        with open(entries_tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(index_tmp, self.index_path)
+        os.replace(entries_tmp, self.entries_path)
+
+# One cache per directory per process, so sessions share the encoder and entries
+_semantic_caches: Dict[str, SemanticCache] = {}
+_semantic_caches_lock = threading.Lock()
+
+def get_semantic_cache(cache_dir: str) -> SemanticCache:
+    """Return the process-wide SemanticCache for cache_dir, loading it on first use"""
+    with _semantic_caches_lock:
+        if cache_dir not in _semantic_caches:
+            _semantic_caches[cache_dir] = SemanticCache(cache_dir)
+        return _semantic_caches[cache_dir]
+
 class AIResearchSystem:
     """Multi-agent system for company research and AI use case generation"""
     
+    # Search and generation tuning; subclasses trade depth for latency
+    QUERIES = {
+        'company_info': "{} company overview business model products",
+        'market_info': "{} market position industry trends competitors",
+        'ai_info': "{} artificial intelligence machine learning initiatives"
+    }
+    SEARCH_DEPTH = 'advanced'
+    MAX_RESULTS = 3
+    SUMMARY_CHARS = 500
+    DETAIL_COUNT = 3
+    PROMPT_PREFIX = _PROMPT_PREFIX
+    PROMPT_SUMMARY_CHARS = 200
+    MAX_CASES = 5
+    SEMCACHE_NAME = '.semcache'
+    
     def __init__(self):
         # Load API keys from environment variables
         self.TAVILY_API_KEY = os.getenv('TAVILY_API_KEY')
@@ -36,126 +291,172 @@ class AIResearchSystem:
         if not self.TAVILY_API_KEY or not self.HUGGINGFACE_KEY:
             raise ValueError("API keys not found. Please set TAVILY_API_KEY and HUGGINGFACE_KEY in .env file")
         
-        # Setup reports directory
-        self.reports_dir = os.path.join(os.path.expanduser('~'), 'Downloads', 'AI_MULTI AGENT_SYSTEM', 'reports')
-        os.makedirs(self.reports_dir, exist_ok=True)
+        # Shared HTTP session so concurrent Tavily calls pool connections
+        self._session = create_session()
         
-        # Initialize LLaMA model
+        # Reports directory (created once at import)
+        self.reports_dir = REPORTS_DIR
+        
+        # Initialize LLaMA model and use case cache
         self.llm = self._initialize_llm()
+        self.semantic_cache = self._initialize_semantic_cache()
+
+    def __del__(self):
+        """Release pooled HTTP connections"""
+        session = getattr(self, '_session', None)
+        if session is not None:
+            session.close()
 
     def _initialize_llm(self):
         """Initialize and configure LLaMA model"""
         try:
-            model_path = hf_hub_download(
-                repo_id="TheBloke/Llama-2-7B-Chat-GGUF",
-                filename="llama-2-7b-chat.Q4_K_M.gguf",
-                token=self.HUGGINGFACE_KEY
-            )
-            return LlamaCpp(
-                model_path=model_path,
+            return build_llm(
+                resolve_model_path(self.HUGGINGFACE_KEY),
+                str(self.reports_dir / '.kvcache'),
+                # Only stream tokens to an interactive terminal
+                stream_to_stdout=sys.stdout.isatty(),
                 temperature=0.7,
                 max_tokens=1000,
                 n_ctx=2048,
                 top_p=1,
-                callbacks=[StreamingStdOutCallbackHandler()],
                 verbose=True
             )
         except Exception as e:
-            print(f"Model initialization error: {str(e)}")
+            self._report_error(f"Model initialization error: {str(e)}")
+            return None
+
+    def _initialize_semantic_cache(self) -> Optional[SemanticCache]:
+        """Load the semantic use case cache"""
+        try:
+            # Keyed on the model file so switching model or quant regenerates
+            _, filename = model_file()
+            return get_semantic_cache(str(self.reports_dir / f"{self.SEMCACHE_NAME}-{filename}"))
+        except Exception as e:
+            self._report_error(f"Semantic cache initialization error: {str(e)}")
             return None
 
+    def _report_error(self, message: str):
+        """Surface a recoverable error to the user"""
+        print(message)
+
     def research_company(self, company_name: str) -> Dict:
         """Research company using parallel requests"""
+        results, _ = self.research_company_with_failures(company_name)
+        return results
+
+    def research_company_with_failures(self, company_name: str) -> Tuple[Dict, List[str]]:
+        """Research company, also returning the categories whose search failed"""
         queries = {
-            'company_info': f"{company_name} company overview business model products",
-            'market_info': f"{company_name} market position industry trends competitors",
-            'ai_info': f"{company_name} artificial intelligence machine learning initiatives"
+            category: template.format(company_name)
+            for category, template in self.QUERIES.items()
         }
         
         results = {}
-        for category, query in queries.items():
-            results[category] = self._make_search_request(query)
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                executor.submit(self._make_search_request, query): category
+                for category, query in queries.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                category = futures[future]
+                # Errors are reported here, on the calling thread, not in the workers
+                try:
+                    results[category] = future.result()
+                except orjson.JSONDecodeError as e:
+                    self._report_error(f"Invalid search response for {category}: {str(e)}")
+                    results[category] = {'summary': '', 'details': []}
+                    failed.append(category)
+                except Exception as e:
+                    self._report_error(f"Search error for {category}: {str(e)}")
+                    results[category] = {'summary': '', 'details': []}
+                    failed.append(category)
         
-        return results
+        # Keep category order stable for reports and display
+        return {category: results[category] for category in queries}, failed
 
     def _make_search_request(self, query: str) -> Dict:
         """Make API request to Tavily"""
         payload = {
             'api_key': self.TAVILY_API_KEY,
             'query': query,
-            'search_depth': 'advanced',
-            'max_results': 3
+            'search_depth': self.SEARCH_DEPTH,
+            'max_results': self.MAX_RESULTS
         }
         
-        try:
-            response = requests.post('https://api.tavily.com/search', json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'summary': self._extract_summary(data.get('results', [])),
-                    'details': self._extract_details(data.get('results', []))
-                }
-        except Exception as e:
-            print(f"Search error: {str(e)}")
-        return {'summary': '', 'details': []}
+        response = self._session.post(
+            'https://api.tavily.com/search',
+            json=payload,
+            timeout=5
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        return {
+            'summary': self._extract_summary(data.get('results', [])),
+            'details': self._extract_details(data.get('results', []))
+        }
 
     def _extract_summary(self, results: List) -> str:
         """Extract and combine relevant information into summary"""
         summaries = []
+        remaining = self.SUMMARY_CHARS
         for result in results:
             content = result.get('content', '').strip()
-            if content:
-                summaries.append(content)
-        return ' '.join(summaries)[:500]
+            if not content:
+                continue
+            # Take only what still fits instead of joining everything and slicing
+            take = content[:remaining]
+            summaries.append(take)
+            remaining -= len(take) + 1
+            if remaining <= 0:
+                break
+        return ' '.join(summaries)
 
     def _extract_details(self, results: List) -> List[str]:
-        """Extract detailed information points"""
-        return [r.get('content', '') for r in results if r.get('content')][:3]
+        """Extract the most substantive information points"""
+        contents = [r['content'] for r in results if r.get('content')]
+        return heapq.nlargest(self.DETAIL_COUNT, contents, key=content_score)
+
+    def generate_use_cases(self, research_data: Dict,
+                           on_case: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Generate AI use cases based on research data, passing each to on_case as it completes"""
+        summary = research_data['company_info']['summary']
+        embedding = None
+        cached = None
+        if self.semantic_cache and summary:
+            try:
+                embedding = self.semantic_cache.embed(summary)
+                cached = self.semantic_cache.lookup(embedding)
+            except Exception as e:
+                self._report_error(f"Semantic cache lookup error: {str(e)}")
+                embedding = None
+        if cached is not None:
+            if on_case:
+                for case in cached:
+                    on_case(case)
+            return cached
 
-    def generate_use_cases(self, research_data: Dict) -> List[Dict]:
-        """Generate AI use cases based on research data"""
         if not self.llm:
             return []
 
-        prompt = f"""Based on this research, generate 5 practical AI/GenAI use cases for {research_data['company_info']['summary'][:200]}
+        prompt = self.PROMPT_PREFIX + summary[:self.PROMPT_SUMMARY_CHARS]
 
-Focus areas:
-- Operational Efficiency
-- Customer Experience
-- Product Innovation
-- Process Automation
-- Data Analytics
-
-Format each as:
-Use Case #[number]:
-1. Problem: [challenge]
-2. Solution: [AI/ML approach]
-3. Complexity: [Low/Medium/High]
-4. Impact: [benefits]
-5. Resources: [requirements]"""
-
-        try:
-            response = self.llm.invoke(prompt)
-            return self._parse_use_cases(response)
-        except Exception as e:
-            print(f"Generation error: {str(e)}")
-            return []
-
-    def _parse_use_cases(self, response: str) -> List[Dict]:
-        """Parse and structure generated use cases"""
         use_cases = []
         try:
-            cases = response.split('Use Case #')[1:]
-            for i, case in enumerate(cases, 1):
-                if case.strip():
-                    lines = case.strip().split('\n')
-                    use_cases.append({
-                        'id': i,
-                        'description': case.strip(),
-                        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
+            for case in stream_parse_cases(self.llm, prompt, max_cases=self.MAX_CASES):
+                use_cases.append(case)
+                if on_case:
+                    on_case(case)
         except Exception as e:
-            print(f"Parsing error: {str(e)}")
+            self._report_error(f"Generation error: {str(e)}")
+            # Keep what was already shown, but never cache a partial result
+            return use_cases
+
+        if embedding is not None and use_cases:
+            try:
+                self.semantic_cache.insert(embedding, use_cases)
+            except Exception as e:
+                self._report_error(f"Semantic cache update error: {str(e)}")
         return use_cases
 
     def save_report(self, company_name: str, research_data: Dict, use_cases: List[Dict]) -> str:
@@ -169,12 +470,10 @@ Use Case #[number]:
         }
         
         filename = f"{company_name.lower().replace(' ', '_')}_{timestamp}_ai_recommendations.json"
-        filepath = os.path.join(self.reports_dir, filename)
+        filepath = self.reports_dir / filename
+        filepath.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=4)
-        
-        return filepath
+        return str(filepath)
 
 def main():
     """Main execution function"""
@@ -195,13 +494,14 @@ def main():
             report_path = system.save_report(company, research_data, use_cases)
             print(f"\nReport saved: {report_path}")
             
-            print("\nKey Findings:")
-            print("\nCompany Overview:")
-            print(research_data['company_info']['summary'][:200])
-            print("\nGenerated Use Cases:")
-            for case in use_cases:
-                print(f"\nUse Case {case['id']}:")
-                print(case['description'][:300])
+            # Write the findings in one call instead of a print per line
+            sys.stdout.write(
+                "\nKey Findings:\n\nCompany Overview:\n"
+                + research_data['company_info']['summary'][:200]
+                + "\n\nGenerated Use Cases:\n\n"
+                + '\n\n'.join(f"Use Case {c['id']}:\n{c['description'][:300]}" for c in use_cases)
+                + '\n'
+            )
                 
     except Exception as e:
         print(f"Error: {str(e)}")
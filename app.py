@@ -18,156 +18,91 @@ The system performs:
 import os
 from dotenv import load_dotenv
 import streamlit as st
-import requests
-import json
+import orjson
 from datetime import datetime
 from typing import Dict, List
-from langchain_community.llms import LlamaCpp
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from huggingface_hub import hf_hub_download
-import concurrent.futures
+import diskcache
+from ai_usecase_system import AIResearchSystem, build_llm, resolve_model_path
 
 # Load environment variables
 load_dotenv()
 
-class FastAIGenerator:
-    """Main class for AI use case generation system"""
+# Constant instructions ahead of the company text so the KV cache reuses them
+_PROMPT_PREFIX = """Generate 3 AI use cases for the company below. Format:
+Use Case #[n]:
+1. Problem: [brief]
+2. Solution: [AI approach]
+3. Impact: [brief]
+
+Company: """
+
+# Disk cache that survives Streamlit worker restarts (L2 under st.cache_data)
+# Sibling of the KV state cache so clearing one never deletes the other
+_dc = diskcache.Cache(os.path.expanduser('~/.cache/ai_usecase/research'))
+
+class FastAIGenerator(AIResearchSystem):
+    """AIResearchSystem tuned for interactive latency in the Streamlit app"""
     
-    def __init__(self):
-        """Initialize the system with API keys and LLaMA model"""
-        # Load API keys from environment variables
-        self.TAVILY_API_KEY = os.getenv('TAVILY_API_KEY')
-        self.HUGGINGFACE_KEY = os.getenv('HUGGINGFACE_KEY')
-        
-        if not self.TAVILY_API_KEY or not self.HUGGINGFACE_KEY:
-            raise ValueError("API keys not found. Please set TAVILY_API_KEY and HUGGINGFACE_KEY in .env file")
-            
-        # Initialize LLaMA model
-        self.llm = self._init_llm()
+    QUERIES = {
+        'company_info': "{} company overview",
+        'market_info': "{} market position",
+        'ai_info': "{} AI initiatives"
+    }
+    SEARCH_DEPTH = 'basic'    # Using basic for speed
+    MAX_RESULTS = 2           # Reduced results
+    SUMMARY_CHARS = 400
+    DETAIL_COUNT = 1
+    PROMPT_PREFIX = _PROMPT_PREFIX
+    PROMPT_SUMMARY_CHARS = 100
+    MAX_CASES = 3
+    SEMCACHE_NAME = '.semcache_fast'
 
-    def _init_llm(self):
+    def _initialize_llm(self):
         """Initialize and configure optimized LLaMA model"""
         try:
-            # Download quantized model
-            model_path = hf_hub_download(
-                repo_id="TheBloke/Llama-2-7B-Chat-GGUF",
-                filename="llama-2-7b-chat.Q4_K_M.gguf",
-                token=self.HUGGINGFACE_KEY
-            )
+            # Local cache directory for model state
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'ai_usecase', 'kvcache')
             
-            # Configure model with optimized parameters
-            return LlamaCpp(
-                model_path=model_path,
+            # Configure quantized model with optimized parameters
+            return build_llm(
+                resolve_model_path(self.HUGGINGFACE_KEY),
+                cache_dir,
                 temperature=0.7,      # Creativity vs consistency
                 max_tokens=256,       # Reduced for speed
                 n_ctx=512,           # Reduced context window
-                n_batch=2048,        # Increased batch size
-                n_threads=12,        # More threads
-                f16_kv=True,         # Half precision
-                use_mlock=True,      # Memory optimization
-                use_mmap=True,       # Memory mapping
                 verbose=False
             )
         except Exception as e:
             st.error(f"Model Error: {e}")
             return None
 
-    def _make_search_request(self, query: str) -> Dict:
-        """Make optimized API request to Tavily"""
-        payload = {
-            'api_key': self.TAVILY_API_KEY,
-            'query': query,
-            'search_depth': 'basic',  # Using basic for speed
-            'max_results': 2          # Reduced results
-        }
-        
-        try:
-            response = requests.post(
-                'https://api.tavily.com/search',
-                json=payload,
-                timeout=5             # Reduced timeout
-            )
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'summary': self._extract_summary(data.get('results', [])),
-                    'details': self._extract_details(data.get('results', []))
-                }
-        except Exception as e:
-            st.error(f"Search Error: {e}")
-        return {'summary': '', 'details': []}
-
-    def _extract_summary(self, results: List) -> str:
-        """Extract and combine relevant information into summary"""
-        return ' '.join(
-            r.get('content', '').strip()[:200]
-            for r in results[:2]
-            if r.get('content')
-        )
+    def _report_error(self, message: str):
+        """Show recoverable errors in the app"""
+        st.error(message)
 
-    def _extract_details(self, results: List) -> List[str]:
-        """Extract detailed information points"""
-        return [r.get('content', '') for r in results[:1] if r.get('content')]
+class IncompleteResearch(Exception):
+    """Raised with partial results so neither cache layer stores failed searches"""
+    
+    def __init__(self, results: Dict, failed: List[str]):
+        super().__init__(f"Searches failed for: {', '.join(failed)}")
+        self.results = results
+        self.failed = failed
 
 @st.cache_data(ttl=3600)
-def cached_research(_company_name: str, _api_key: str) -> Dict:
+def cached_research(_generator: FastAIGenerator, company_name: str) -> Dict:
     """Perform cached research with parallel processing"""
-    queries = {
-        'company_info': f"{_company_name} company overview",
-        'market_info': f"{_company_name} market position",
-        'ai_info': f"{_company_name} AI initiatives"
-    }
-    
-    results = {}
-    for category, query in queries.items():
-        payload = {
-            'api_key': _api_key,
-            'query': query,
-            'search_depth': 'basic',
-            'max_results': 2
-        }
-        
-        try:
-            response = requests.post(
-                'https://api.tavily.com/search',
-                json=payload,
-                timeout=5
-            )
-            if response.status_code == 200:
-                data = response.json()
-                results[category] = {
-                    'summary': ' '.join(r.get('content', '').strip()[:200] 
-                                      for r in data.get('results', [])[:2]),
-                    'details': [r.get('content', '') 
-                              for r in data.get('results', [])[:1]]
-                }
-            else:
-                results[category] = {'summary': '', 'details': []}
-        except Exception as e:
-            st.error(f"API Error for {category}: {e}")
-            results[category] = {'summary': '', 'details': []}
+    key = ('research', company_name.lower(), datetime.now().strftime('%Y-%m-%d'))
+    if key in _dc:
+        return _dc[key]
     
+    results, failed = _generator.research_company_with_failures(company_name)
+    # Raising keeps st.cache_data from storing partial research, so failed
+    # searches are retried on the next run
+    if failed:
+        raise IncompleteResearch(results, failed)
+    _dc.set(key, results, expire=3600 * 24)
     return results
 
-@st.cache_data(ttl=3600)
-def cached_use_cases(_research_data: Dict, _model_output: str) -> List[Dict]:
-    """Generate and cache use cases"""
-    try:
-        cases = _model_output.split('Use Case #')[1:]
-        return [
-            {
-                'id': i,
-                'description': case.strip(),
-                'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            for i, case in enumerate(cases, 1)
-            if case.strip()
-        ]
-    except Exception as e:
-        st.error(f"Parsing Error: {e}")
-        return []
-
 def main():
     """Main application function"""
     # Configure Streamlit page
@@ -190,10 +125,10 @@ def main():
         if company_name:
             with st.spinner("Processing..."):
                 # Research phase
-                research_data = cached_research(
-                    company_name,
-                    st.session_state.generator.TAVILY_API_KEY
-                )
+                try:
+                    research_data = cached_research(st.session_state.generator, company_name)
+                except IncompleteResearch as e:
+                    research_data = e.results
                 
                 # Display results in columns
                 cols = st.columns(3)
@@ -204,21 +139,16 @@ def main():
                 
                 # Generate use cases if model is available
                 if st.session_state.generator.llm:
-                    prompt = f"""Quick analysis for:
-Company: {research_data['company_info']['summary'][:100]}
-Generate 3 AI use cases. Format:
-Use Case #[n]:
-1. Problem: [brief]
-2. Solution: [AI approach]
-3. Impact: [brief]"""
-
-                    model_output = st.session_state.generator.llm.invoke(prompt)
-                    use_cases = cached_use_cases(research_data, model_output)
+                    # Show each use case as soon as the model finishes it,
+                    # re-rendering one markdown element rather than adding widgets
+                    placeholder = st.empty()
+                    sections = []
+                    
+                    def show_case(case: Dict):
+                        sections.append(f"#### Use Case {case['id']}\n\n{case['description']}")
+                        placeholder.markdown('\n\n'.join(sections))
                     
-                    # Display generated use cases
-                    for case in use_cases:
-                        with st.expander(f"Use Case {case['id']}"):
-                            st.write(case['description'])
+                    use_cases = st.session_state.generator.generate_use_cases(research_data, on_case=show_case)
                     
                     # Prepare and offer report download
                     report = {
@@ -230,7 +160,7 @@ Use Case #[n]:
                     
                     st.download_button(
                         "📥 Download Report",
-                        json.dumps(report, indent=2),
+                        orjson.dumps(report, option=orjson.OPT_INDENT_2).decode(),
                         f"{company_name.lower()}_ai_report.json",
                         "application/json"
                     )